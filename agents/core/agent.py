@@ -2,11 +2,12 @@
 from agents.utils.logging_utils import log_manager
 from agents.db.db import get_db
 import threading, time, json, traceback, os, re
+from contextlib import nullcontext
 from datetime import datetime
 
 class Agent:
 
-    def __init__(self, name, task, color, emoji, model_name, ollama, colors, bus, verbose, max_iterations):
+    def __init__(self, name, task, color, emoji, model_name, ollama, colors, bus, verbose, max_iterations, ollama_slots=None):
         self.name = name
         self.tasks = task if isinstance(task, list) else [task]
         self.color = color
@@ -17,6 +18,7 @@ class Agent:
         self.bus = bus
         self.verbose = verbose
         self.max_iterations = max_iterations
+        self.ollama_slots = ollama_slots if ollama_slots is not None else nullcontext()
         self.progress = []
 
     def run(self):
@@ -66,7 +68,8 @@ class Agent:
                     with lock:
                         for attempt in range(3):
                             try:
-                                response = self.ollama.chat(model=self.model_name, messages=messages)
+                                with self.ollama_slots:
+                                    response = self.ollama.chat(model=self.model_name, messages=messages)
                                 break
                             except Exception as e:
                                 if hasattr(e, 'response') and hasattr(e.response, 'status_code') and e.response.status_code == 500:
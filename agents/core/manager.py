@@ -1,16 +1,70 @@
 # core/manager.py
-import time, re, json, os, random
+import time, re, os, random, asyncio, hashlib, functools, sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import msgspec, orjson
 
-from datetime import datetime
 from agents.services.agent_service import AgentService
-from agents.db.db import init_db, get_db
+from agents.db.db import init_db, get_db, connect
 from agents.utils.logging_utils import log_manager
 from agents.services.manager_analytics import ManagerAnalytics
 from agents.utils.message_bus import MessageBus
 from agents.services.orchestration_service import OrchestrationService
+from agents.utils.config import AGENT_LIST_CACHE_TTL, PLANNER_BATCH_SIZE
+
+PLANNER_PROMPT = (
+    "You are an expert project planner. Given a user task, break it down into 2-6 clear, actionable subtasks. "
+    "Return only a JSON list of strings, each string being a subtask. Do not include any explanation, markdown, or extra text. "
+    "Output ONLY a valid JSON array, e.g. [\"Subtask 1\", \"Subtask 2\"]"
+)
+JSON_REMINDER_PROMPT = "Reminder: output ONLY a valid JSON array of strings, no extra text."
+BATCH_PLANNER_PROMPT = (
+    "You are an expert project planner. You will be given a JSON array of N user tasks. For each task, break it down into 2-6 clear, actionable subtasks. "
+    "Return a JSON array of arrays; outer length=N, in the same order as the tasks, each inner array being that task's subtasks as strings. "
+    "Do not include any explanation, markdown, or extra text. Output ONLY valid JSON, e.g. [[\"Subtask 1\", \"Subtask 2\"], [\"Subtask 1\"]]"
+)
+
+EXAMPLE_TASKS = {
+    '1': "Scrape techmeme.com and summarize the top headlines.",
+    '2': "Make a mini ai agent.",
+}
+
+# Word pools for random project names
+_PROJECT_COUSINS = ("shrimp", "lobster", "crab", "prawn", "copepod", "amphipod", "isopod", "mantis", "mysid", "barnacle")
+_PROJECT_COLORS = ("red", "blue", "green", "yellow", "purple", "orange", "pink", "black", "white", "gray")
+
+_BULLET_RE = re.compile(r'\s*(?:\d+\.|[-*])\s+(.*)')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+# Parses and type-checks the planner's JSON array of subtask strings in one pass
+_AGENT_LIST_DECODER = msgspec.json.Decoder(list[str])
+_AGENT_LISTS_DECODER = msgspec.json.Decoder(list[list[str]])
+
+def _looks_like_json_array(s):
+    """Cheap structural check run before attempting a full JSON parse."""
+    s = s.strip()
+    return len(s) >= 2 and s[0] == '[' and s[-1] == ']'
+
+def _extract_content(response):
+    """Return the message text from an object, dict, or plain chat response."""
+    try:
+        message = response.message
+        return message if isinstance(message, str) else str(message.content)
+    except AttributeError:
+        pass
+    try:
+        message = response['message']
+        return message if isinstance(message, str) else str(message.get('content', message))
+    except (TypeError, KeyError, AttributeError):
+        return str(response)
+
+def _assign(agent_list, num_agents):
+    """Round-robin subtasks across agents; returns (agent_names, agent_subtasks)."""
+    agent_names = [f"agent_{i+1}" for i in range(num_agents)]
+    agent_subtasks = [agent_list[i::num_agents] for i in range(num_agents)]
+    return agent_names, agent_subtasks
 
 class Manager:
-    def __init__(self, model_name, ollama, colors, agent_colors, agent_emojis, verbose=False):
+    def __init__(self, model_name, ollama, colors, agent_colors, agent_emojis, verbose=False, cache_ttl=AGENT_LIST_CACHE_TTL):
         self.model_name = model_name
         self.ollama = ollama
         self.colors = colors
@@ -22,57 +76,149 @@ class Manager:
         self.progress = {}
         self.completed = set()
         self.verbose = verbose
+        self.cache_ttl = cache_ttl
+        self._agent_tasks_cache = {}
+        self._conn = None
 
     def estimate_agents(self, main_task):
         """Use Ollama to estimate a list of subtasks/agents for the main task."""
-        base_prompt = (
-            "You are an expert project planner. Given a user task, break it down into 2-6 clear, actionable subtasks. "
-            "Return only a JSON list of strings, each string being a subtask. Do not include any explanation, markdown, or extra text. "
-            "Output ONLY a valid JSON array, e.g. [\"Subtask 1\", \"Subtask 2\"]"
-        )
-        for attempt in range(3):
-            prompt = base_prompt
-            if attempt > 0:
-                prompt += "\n\nPrevious output was not valid JSON. Please output ONLY a valid JSON array, no extra text."
-            messages = [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": main_task}
-            ]
-            try:
-                response = self.ollama.chat(model=self.model_name, messages=messages)
-            except Exception as e:
-                if 'hourly usage limit' in str(e) or 'status code: 402' in str(e):
-                    log_manager("Error Ollama: you've reached your hourly usage limit, please upgrade to continue", colors=self.colors, level="ERROR")
-                    exit(1)
-                else:
-                    raise
-            # Support both dict and object response, fallback to str if needed
-            if hasattr(response, 'message'):
-                content = response.message
-            elif isinstance(response, dict) and 'message' in response:
-                content = response['message']
-            else:
-                content = str(response)
-            # Ensure content is a string (handle pydantic Message or other objects)
-            if not isinstance(content, str):
-                content = str(getattr(content, 'content', content))
+        agent_list = self._get_cached_agent_list(main_task)
+        if agent_list is not None:
+            log_manager("Using cached subtasks for this task.", colors=self.colors, level="INFO")
+            return agent_list
+        return asyncio.run(self._estimate_agents_async(main_task))
+
+    def estimate_agents_batch(self, main_tasks):
+        """Plan subtasks for several tasks, packing up to PLANNER_BATCH_SIZE tasks per LLM call."""
+        results = [self._get_cached_agent_list(task) for task in main_tasks]
+        misses = [idx for idx, agent_list in enumerate(results) if agent_list is None]
+        chunks = [misses[i:i + PLANNER_BATCH_SIZE] for i in range(0, len(misses), PLANNER_BATCH_SIZE)]
+        if chunks:
+            log_manager(f"Planning {len(misses)} tasks in {len(chunks)} batched request(s)...", colors=self.colors, level="INFO")
+            planned = asyncio.run(self._estimate_agents_batch_async([[main_tasks[idx] for idx in chunk] for chunk in chunks]))
+            for chunk, agent_lists in zip(chunks, planned):
+                if agent_lists is None:
+                    agent_lists = [None] * len(chunk)
+                for idx, agent_list in zip(chunk, agent_lists):
+                    if agent_list:
+                        results[idx] = agent_list
+                        self._cache_agent_list(main_tasks[idx], agent_list)
+                    else:
+                        # Batch response was unusable or empty for this task; plan it on its own
+                        results[idx] = self.estimate_agents(main_tasks[idx])
+        return results
+
+    def _agent_list_cache_key(self, main_task):
+        return hashlib.sha256(f"{self.model_name}|{main_task}".encode()).hexdigest()
+
+    def _get_cached_agent_list(self, main_task):
+        # Return a previously planned subtask list if it is younger than cache_ttl
+        if not self.cache_ttl:
+            return None
+        try:
+            with self._db() as conn:
+                c = conn.cursor()
+                c.execute(
+                    "SELECT subtasks_json FROM agent_list_cache WHERE prompt_hash=? AND created_at >= datetime('now', ?)",
+                    (self._agent_list_cache_key(main_task), f"-{int(self.cache_ttl)} seconds")
+                )
+                row = c.fetchone()
+        except sqlite3.OperationalError:
+            # init_db() hasn't created the cache table yet; treat as a miss
+            return None
+        if row:
             try:
-                agent_list = json.loads(content)
-                if isinstance(agent_list, list) and all(isinstance(x, str) for x in agent_list):
+                return _AGENT_LIST_DECODER.decode(row[0]) or None
+            except msgspec.DecodeError:
+                return None
+        return None
+
+    def _cache_agent_list(self, main_task, agent_list):
+        # Empty plans would start agents with nothing to do, so never keep them
+        if not self.cache_ttl or not agent_list:
+            return
+        try:
+            with self._db() as conn:
+                c = conn.cursor()
+                c.execute(
+                    "INSERT OR REPLACE INTO agent_list_cache (prompt_hash, model, subtasks_json, created_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+                    (self._agent_list_cache_key(main_task), self.model_name, orjson.dumps(agent_list).decode())
+                )
+                conn.commit()
+        except sqlite3.OperationalError:
+            pass
+
+    async def _estimate_agents_async(self, main_task):
+        """Fire all planning attempts concurrently and keep the first valid JSON list."""
+        # The system prompt and task stay identical across attempts so Ollama can reuse
+        # the KV cache for that prefix. Attempts differ only by a trailing reminder and
+        # a fresh random sampling seed, so each one is an independent draw rather than a retry.
+        prefix = [
+            {"role": "system", "content": PLANNER_PROMPT},
+            {"role": "user", "content": main_task}
+        ]
+        attempt_messages = [prefix] + [prefix + [{"role": "user", "content": JSON_REMINDER_PROMPT}]] * 2
+        client = self._async_client()
+        # A private pool (instead of asyncio.to_thread) so returning early does not wait for
+        # the slower sync calls; those finish in the background and their replies are dropped.
+        executor = ThreadPoolExecutor(max_workers=len(attempt_messages)) if client is None else None
+        tasks = {
+            asyncio.ensure_future(self._chat(client, messages, options={"seed": random.randrange(2**31)}, executor=executor)): attempt
+            for attempt, messages in enumerate(attempt_messages)
+        }
+        contents = [None] * len(tasks)
+        errors = []
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.get):
+                    attempt = tasks[task]
+                    try:
+                        content = task.result()
+                    except Exception as e:
+                        self._check_usage_limit(e)
+                        log_manager(f"Attempt {attempt+1}: Ollama request failed. Error: {e}", colors=self.colors, level="WARNING")
+                        errors.append(e)
+                        continue
+                    contents[attempt] = content
+                    if not _looks_like_json_array(content):
+                        # Narrative text can't be a list; skip the parse and its exception
+                        log_manager(f"Attempt {attempt+1}: LLM response is not a JSON array.", colors=self.colors, level="WARNING")
+                        continue
+                    try:
+                        agent_list = _AGENT_LIST_DECODER.decode(content)
+                    except msgspec.DecodeError as e:
+                        log_manager(f"Attempt {attempt+1}: Could not parse JSON from LLM response. Error: {e}", colors=self.colors, level="WARNING")
+                        continue
+                    if not agent_list:
+                        log_manager(f"Attempt {attempt+1}: LLM returned an empty subtask list.", colors=self.colors, level="WARNING")
+                        continue
+                    self._cache_agent_list(main_task, agent_list)
                     return agent_list
-            except Exception as e:
-                log_manager(f"Attempt {attempt+1}: Could not parse JSON from LLM response. Error: {e}", colors=self.colors, level="WARNING")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        if len(errors) == len(tasks):
+            # Every attempt failed outright; surface the error as the sequential loop did
+            raise errors[-1]
+        contents = [content for content in contents if content is not None]
+        # Only reached when no concurrent attempt returned valid JSON
+        for content in contents:
             # Fallback: try to extract from numbered/bulleted list
             lines = content.splitlines()
             extracted = []
             for line in lines:
-                m = re.match(r'\s*(?:\d+\.|[-*])\s+(.*)', line)
+                m = _BULLET_RE.match(line)
                 if m:
                     item = m.group(1).strip().strip('"').strip("'")
                     if item:
                         extracted.append(item)
             # Final fallback: split into sentences if possible
-            sentences = re.split(r'(?<=[.!?])\s+', content.strip())
+            sentences = _SENTENCE_RE.split(content.strip())
             sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
             if len(sentences) > 1:
                 log_manager(f"LLM did not return a list, but split into {len(sentences)} subtasks using sentences. Raw response was:\n{content}", colors=self.colors, level="WARNING")
@@ -80,6 +226,55 @@ class Manager:
         log_manager(f"Could not parse agent list from LLM after 3 attempts and all fallbacks.\nRaw LLM response was:\n{content}", colors=self.colors, level="ERROR")
         return [main_task]
 
+    async def _estimate_agents_batch_async(self, task_chunks):
+        """Send one planning request per chunk concurrently; None marks an unusable response."""
+        client = self._async_client()
+        responses = await asyncio.gather(*(
+            self._chat(client, [
+                {"role": "system", "content": BATCH_PLANNER_PROMPT},
+                {"role": "user", "content": orjson.dumps(chunk).decode()}
+            ])
+            for chunk in task_chunks
+        ), return_exceptions=True)
+        planned = []
+        for batch_idx, (content, chunk) in enumerate(zip(responses, task_chunks)):
+            if isinstance(content, Exception):
+                # A failed request is handled like an unusable reply: plan those tasks one by one
+                self._check_usage_limit(content)
+                log_manager(f"Batch {batch_idx+1}: Ollama request failed. Error: {content}", colors=self.colors, level="WARNING")
+                planned.append(None)
+                continue
+            agent_lists = None
+            if _looks_like_json_array(content):
+                try:
+                    agent_lists = _AGENT_LISTS_DECODER.decode(content)
+                except msgspec.DecodeError as e:
+                    log_manager(f"Batch {batch_idx+1}: Could not parse JSON from LLM response. Error: {e}", colors=self.colors, level="WARNING")
+            if agent_lists is not None and len(agent_lists) != len(chunk):
+                log_manager(f"Batch {batch_idx+1}: expected {len(chunk)} subtask lists, got {len(agent_lists)}.", colors=self.colors, level="WARNING")
+                agent_lists = None
+            planned.append(agent_lists)
+        return planned
+
+    def _async_client(self):
+        # Prefer the native async client; None means run the sync client in threads
+        async_client_cls = getattr(self.ollama, 'AsyncClient', None)
+        return async_client_cls() if async_client_cls else None
+
+    def _check_usage_limit(self, e):
+        if 'hourly usage limit' in str(e) or 'status code: 402' in str(e):
+            log_manager("Error Ollama: you've reached your hourly usage limit, please upgrade to continue", colors=self.colors, level="ERROR")
+            exit(1)
+
+    async def _chat(self, client, messages, options=None, executor=None):
+        """Send one chat request and return the response text."""
+        if client is not None:
+            response = await client.chat(model=self.model_name, messages=messages, options=options)
+        else:
+            call = functools.partial(self.ollama.chat, model=self.model_name, messages=messages, options=options)
+            response = await asyncio.get_running_loop().run_in_executor(executor, call)
+        return _extract_content(response)
+
 
     def assign_tasks(self, agent_list):
         manager_name = "manager"
@@ -87,40 +282,39 @@ class Manager:
             self.bus.send(manager_name, name, f"You are assigned the following minimal task: {agent_list[idx]}")
 
 
-    def orchestrate(self):
-        # Ensure 'output' directory exists
-        output_root = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'output')
-        if not os.path.exists(output_root):
-            os.makedirs(output_root, exist_ok=True)
+    @contextmanager
+    def _db(self):
+        # Reuse the connection opened by orchestrate() when there is one. Commit on exit so
+        # callers that don't commit (e.g. OrchestrationService) never hold the write lock.
+        if self._conn is None:
+            with get_db() as conn:
+                yield conn
+            return
+        try:
+            yield self._conn
+        except Exception:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+    def orchestrate_interactive(self):
+        """Prompt for the task, agent count and iterations, then delegate to orchestrate()."""
         init_db()
         # Show two example tasks and allow user to select or enter their own
-        example1 = "Scrape techmeme.com and summarize the top headlines."
-        example2 = "Make a mini ai agent."
         log_manager("Describe the task you want to complete:", colors=self.colors, level="BOLD")
-        log_manager(f"  1. {example1}")
-        log_manager(f"  2. {example2}")
+        for key, example in EXAMPLE_TASKS.items():
+            log_manager(f"  {key}. {example}")
         log_manager("  3. Enter your own task")
-        choice = input(f"{self.colors.OKBLUE}Select 1, 2, or type your own task:{self.colors.ENDC} ")
-        if choice.strip() == '1':
-            main_task = example1
-        elif choice.strip() == '2':
-            main_task = example2
-        elif choice.strip() == '3' or not choice.strip():
-            main_task = input(f"{self.colors.OKBLUE}Enter your custom task:{self.colors.ENDC} ")
-        else:
-            main_task = choice.strip()
+        choice = input(f"{self.colors.OKBLUE}Select 1, 2, or type your own task:{self.colors.ENDC} ").strip()
+        main_task = EXAMPLE_TASKS.get(choice)
+        if main_task is None:
+            if choice in ('3', ''):
+                main_task = input(f"{self.colors.OKBLUE}Enter your custom task:{self.colors.ENDC} ")
+            else:
+                main_task = choice
 
-        # Generate random project name
-        cousins = ["shrimp", "lobster", "crab", "prawn", "copepod", "amphipod", "isopod", "mantis", "mysid", "barnacle"]
-        colors = ["red", "blue", "green", "yellow", "purple", "orange", "pink", "black", "white", "gray"]
-        project_name = f"{random.choice(cousins)}-{random.choice(colors)}-{random.randint(1, 99)}"
-        log_manager(f"Project name: {project_name}", colors=self.colors, level="INFO")
-        self.project_name = project_name
-        log_manager("Manager is analyzing the main task and creating minimal subtasks...", colors=self.colors, level="INFO")
-        agent_list = self.estimate_agents(main_task)
-        log_manager(f"Manager created {len(agent_list)} minimal subtasks:", colors=self.colors, level="SUCCESS")
-        for i, subtask in enumerate(agent_list):
-            log_manager(f"  {i+1}. {subtask}")
+        project_name = self._new_project_name()
+        agent_list = self._plan(main_task)
 
         # Prompt for number of agents (default 1)
         while True:
@@ -135,27 +329,6 @@ class Manager:
             except ValueError:
                 print(f"{self.colors.WARNING}Please enter a valid integer greater than or equal to 1.{self.colors.ENDC}")
 
-        # Assign subtasks to agents
-        if num_agents == 1:
-            agent_names = ["agent_1"]
-            agent_subtasks = [agent_list]
-        else:
-            agent_names = [f"agent_{i+1}" for i in range(num_agents)]
-            agent_subtasks = [[] for _ in range(num_agents)]
-            for idx, subtask in enumerate(agent_list):
-                agent_subtasks[idx % num_agents].append(subtask)
-
-        log_manager("\nAgent Assignments:", colors=self.colors, level="BOLD")
-        for idx, name in enumerate(agent_names):
-            emoji = self.agent_emojis[idx % len(self.agent_emojis)]
-            # Show all subtasks for each agent
-            if num_agents == 1:
-                for j, subtask in enumerate(agent_list):
-                    log_manager(f"  {emoji} {name}: {subtask}")
-            else:
-                for j, subtask in enumerate(agent_subtasks[idx]):
-                    log_manager(f"  {emoji} {name} subtask {j+1}: {subtask}")
-
         # Prompt for number of iterations (default 1)
         while True:
             num_iterations = input(f"{self.colors.OKBLUE}How many iterations per agent? (1-infinite, default 1): {self.colors.ENDC}")
@@ -170,29 +343,103 @@ class Manager:
                 pass
             log_manager("Please enter a valid integer >= 1 or leave blank for 1.", colors=self.colors, level="WARNING")
 
-        self.num_agents = num_agents
-        self.num_iterations = num_iterations
+        return self.orchestrate(main_task, num_agents, num_iterations, agent_list=agent_list, collect_feedback=True, project_name=project_name)
+
+    def orchestrate_batch(self, main_tasks, num_agents=1, num_iterations=1):
+        """Plan all tasks with batched LLM calls, then run each one; returns the report paths."""
+        init_db()
+        agent_lists = self.estimate_agents_batch(main_tasks)
+        return [
+            self.orchestrate(main_task, num_agents, num_iterations, agent_list=agent_list)
+            for main_task, agent_list in zip(main_tasks, agent_lists)
+        ]
+
+    def orchestrate(self, main_task, num_agents=1, num_iterations=1, agent_list=None, collect_feedback=False, project_name=None):
+        """
+        Run one task end to end without prompting and return the report path.
+        Args:
+            main_task (str): The task to plan and execute.
+            num_agents (int): Number of agents to spread subtasks across.
+            num_iterations (int): Iterations per agent subtask.
+            agent_list (list, optional): Pre-planned, non-empty subtasks; planned with estimate_agents if None.
+            collect_feedback (bool): Ask for user feedback once the run completes.
+            project_name (str, optional): Name for the output directory; generated if None.
+        """
+        if num_agents < 1 or num_iterations < 1:
+            raise ValueError("num_agents and num_iterations must be >= 1")
+        if agent_list is not None and not agent_list:
+            raise ValueError("agent_list must contain at least one subtask")
+        # Ensure 'output' directory exists
+        output_root = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'output')
+        if not os.path.exists(output_root):
+            os.makedirs(output_root, exist_ok=True)
+        init_db()
+        # One connection for the whole run instead of one per query
+        self._conn = connect()
+        try:
+            return self._orchestrate(main_task, num_agents, num_iterations, agent_list, collect_feedback, project_name)
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def _plan(self, main_task):
+        log_manager("Manager is analyzing the main task and creating minimal subtasks...", colors=self.colors, level="INFO")
+        agent_list = self.estimate_agents(main_task)
+        log_manager(f"Manager created {len(agent_list)} minimal subtasks:", colors=self.colors, level="SUCCESS")
+        for i, subtask in enumerate(agent_list):
+            log_manager(f"  {i+1}. {subtask}")
+        return agent_list
 
-        # Assign subtasks to agents
-        if self.num_agents == 1:
-            agent_names = ["agent_1"]
-            agent_subtasks = [agent_list]
+    def _new_project_name(self):
+        # Generate and announce a random project name
+        project_name = f"{random.choice(_PROJECT_COUSINS)}-{random.choice(_PROJECT_COLORS)}-{random.randint(1, 99)}"
+        log_manager(f"Project name: {project_name}", colors=self.colors, level="INFO")
+        return project_name
+
+    def _orchestrate(self, main_task, num_agents, num_iterations, agent_list, collect_feedback, project_name):
+        # Fresh bus per run so messages from an earlier run in this process are not replayed
+        self.bus = MessageBus()
+        self.project_name = project_name or self._new_project_name()
+        if agent_list is None:
+            agent_list = self._plan(main_task)
+
+        # Agents without a subtask never report back, so never start more agents than subtasks
+        if num_agents > len(agent_list):
+            log_manager(f"Only {len(agent_list)} subtasks; using {len(agent_list)} agents instead of {num_agents}.", colors=self.colors, level="WARNING")
+            num_agents = len(agent_list)
+
+        # Assign subtasks to agents (round-robin)
+        agent_names, agent_subtasks = _assign(agent_list, num_agents)
+
+        emoji_for = [self.agent_emojis[idx % len(self.agent_emojis)] for idx in range(num_agents)]
+        log_manager("\nAgent Assignments:", colors=self.colors, level="BOLD")
+        # Show all subtasks for each agent in a single log call
+        if num_agents == 1:
+            block = "\n".join(f"  {emoji_for[0]} {agent_names[0]}: {subtask}" for subtask in agent_list)
         else:
-            agent_names = [f"agent_{i+1}" for i in range(self.num_agents)]
-            agent_subtasks = [[] for _ in range(self.num_agents)]
-            for idx, subtask in enumerate(agent_list):
-                agent_subtasks[idx % self.num_agents].append(subtask)
+            block = "\n".join(
+                f"  {emoji_for[idx]} {name} subtask {j+1}: {subtask}"
+                for idx, name in enumerate(agent_names)
+                for j, subtask in enumerate(agent_subtasks[idx])
+            )
+        log_manager(block)
+
+        self.num_agents = num_agents
+        self.num_iterations = num_iterations
 
         # Save run and agent assignments to DB
-        with get_db() as conn:
+        with self._db() as conn:
             c = conn.cursor()
-            c.execute("INSERT INTO runs (task, manager_subtasks) VALUES (?, ?)", (main_task, json.dumps(agent_list)))
+            c.execute("INSERT INTO runs (task, manager_subtasks) VALUES (?, ?)", (main_task, orjson.dumps(agent_list).decode()))
             run_id = c.lastrowid
-            agent_ids = {}
-            for idx, agent_name in enumerate(agent_names):
-                c.execute("INSERT INTO agents (run_id, agent_name, assigned_subtask) VALUES (?, ?, ?)", (run_id, agent_name, json.dumps(agent_subtasks[idx])))
-                agent_ids[agent_name] = c.lastrowid
+            rows = [(run_id, agent_name, orjson.dumps(agent_subtasks[idx]).decode()) for idx, agent_name in enumerate(agent_names)]
+            c.executemany("INSERT INTO agents (run_id, agent_name, assigned_subtask) VALUES (?, ?, ?)", rows)
+            # executemany doesn't expose per-row lastrowid, so read the ids back in one query
+            c.execute("SELECT id, agent_name FROM agents WHERE run_id=?", (run_id,))
+            agent_ids = {agent_name: agent_id for agent_id, agent_name in c.fetchall()}
             conn.commit()
+        # Assignments don't change during the run, so serve _get_agent_tasks from memory
+        self._agent_tasks_cache = {agent_name: assigned for _, agent_name, assigned in rows}
         # Use AgentService for agent creation
         agent_service = AgentService(
             agent_colors=self.agent_colors,
@@ -214,9 +461,10 @@ class Manager:
         self._db_agent_ids = agent_ids
         # Show agent assignments
         log_manager("\nAgent Assignments:", colors=self.colors, level="BOLD")
-        for idx, name in enumerate(self.agent_names):
-            emoji = self.agent_emojis[idx % len(self.agent_emojis)]
-            log_manager(f"  {emoji} {name}: {agent_list[idx]}")
+        log_manager("\n".join(
+            f"  {emoji_for[idx]} {name}: {'; '.join(agent_subtasks[idx])}"
+            for idx, name in enumerate(self.agent_names)
+        ))
 
         # Use OrchestrationService for main review/approval loop
         orchestration_service = OrchestrationService(
@@ -233,57 +481,63 @@ class Manager:
             get_agent_tasks=self._get_agent_tasks,
             progress=self.progress,
             completed=self.completed,
-            _get_db=get_db,
+            _get_db=self._db,
             token_count=token_count_box
         )
 
         # Summarize and log run using ManagerAnalytics
-        analytics = ManagerAnalytics(get_db, self.colors)
+        analytics = ManagerAnalytics(self._db, self.colors)
         analytics.save_run_summary(
             run_id=self._db_run_id,
             agent_names=self.agent_names,
             progress=self.progress,
             start_time=start_time,
-            token_count=token_count_box[0]
+            token_count=token_count_box[0],
+            collect_feedback=collect_feedback
         )
 
         # --- Save summary and solution to output/project_name directory ---
         output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'output', self.project_name)
         os.makedirs(output_dir, exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
         # Compile agent files into final report
         agent_files = []
         for name in self.agent_names:
             agent_dir = os.path.join(output_dir, name)
-            if os.path.exists(agent_dir):
-                for fname in os.listdir(agent_dir):
-                    agent_files.append(os.path.join(agent_dir, fname))
-        report_lines = [
-            f"Project: {self.project_name}",
-            f"Task: {main_task}",
-            f"Completed at: {timestamp}",
-            "",
-            "Agent Summaries:",
-        ]
+            if os.path.isdir(agent_dir):
+                with os.scandir(agent_dir) as it:
+                    agent_files.extend(entry.path for entry in it if entry.is_file())
+        report_path = os.path.join(output_dir, f"report_{timestamp}.txt")
+        # Stream lines straight into a buffered file rather than joining one big string
+        with open(report_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(f"{line}\n" for line in self._report_lines(main_task, timestamp, agent_files, agent_task_summaries))
+        log_manager(f"\n{self.colors.OKGREEN}Final report saved to {report_path}{self.colors.ENDC}", colors=self.colors, level="SUCCESS")
+        return report_path
+
+
+    def _report_lines(self, main_task, timestamp, agent_files, agent_task_summaries):
+        # Lazily yield the lines of the final run report
+        yield f"Project: {self.project_name}"
+        yield f"Task: {main_task}"
+        yield f"Completed at: {timestamp}"
+        yield ""
+        yield "Agent Summaries:"
         for name in self.agent_names:
-            report_lines.append(f"- {name}: {self.progress.get(name, '')}")
-        report_lines.append("\nAgent Files:")
+            yield f"- {name}: {self.progress.get(name, '')}"
+        yield "\nAgent Files:"
         for fpath in agent_files:
-            report_lines.append(f"  {os.path.basename(fpath)}")
-        report_lines.append("\nAgent Task Details:")
+            yield f"  {os.path.basename(fpath)}"
+        yield "\nAgent Task Details:"
         for name, summaries in agent_task_summaries.items():
-            report_lines.append(f"\n{name}:")
+            yield f"\n{name}:"
             for s in summaries:
-                report_lines.append(f"  {s}")
-        report_path = os.path.join(output_dir, f"report_{timestamp}.txt")
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(report_lines))
-        log_manager(f"\n{self.colors.OKGREEN}Final report saved to {report_path}{self.colors.ENDC}", colors=self.colors, level="SUCCESS")
-
+                yield f"  {s}"
 
     def _get_agent_tasks(self, name):
-        # Helper to get the list of tasks assigned to an agent from the DB
-        with get_db() as conn:
+        # Helper to get the list of tasks assigned to an agent, falling back to the DB
+        if name in self._agent_tasks_cache:
+            return self._agent_tasks_cache[name]
+        with self._db() as conn:
             c = conn.cursor()
             c.execute("SELECT assigned_subtask FROM agents WHERE agent_name=? ORDER BY id DESC LIMIT 1", (name,))
             row = c.fetchone()
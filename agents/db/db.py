@@ -4,9 +4,18 @@ from contextlib import contextmanager
 
 DB_PATH = 'babyagi.db'
 
+def connect():
+    """Open a connection with the per-connection pragmas used across the app."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
 def init_db():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
+    # WAL is persistent on the database file and lets readers run during writes
+    c.execute('PRAGMA journal_mode=WAL')
     # Main task and run summary
     c.execute('''CREATE TABLE IF NOT EXISTS runs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,6 +41,8 @@ def init_db():
         config TEXT,
         FOREIGN KEY(run_id) REFERENCES runs(id)
     )''')
+    # Latest assignment lookup by agent name (see Manager._get_agent_tasks)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_agents_name_id ON agents(agent_name, id DESC)')
     # Agent iterations and responses
     c.execute('''CREATE TABLE IF NOT EXISTS agent_iterations (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -47,12 +58,19 @@ def init_db():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY(agent_id) REFERENCES agents(id)
     )''')
+    # Cached manager planning results, keyed by hash of model + main task
+    c.execute('''CREATE TABLE IF NOT EXISTS agent_list_cache (
+        prompt_hash TEXT PRIMARY KEY,
+        model TEXT,
+        subtasks_json TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
     conn.commit()
     conn.close()
 
 @contextmanager
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     try:
         yield conn
     finally:
@@ -1,9 +1,10 @@
 # agents/services/agent_service.py
 import threading
 from agents.core.agent import Agent
+from agents.utils.config import OLLAMA_NUM_PARALLEL
 
 class AgentService:
-    def __init__(self, agent_colors, agent_emojis, model_name, ollama, colors, bus, verbose, num_iterations):
+    def __init__(self, agent_colors, agent_emojis, model_name, ollama, colors, bus, verbose, num_iterations, num_parallel=OLLAMA_NUM_PARALLEL):
         self.agent_colors = agent_colors
         self.agent_emojis = agent_emojis
         self.model_name = model_name
@@ -12,6 +13,8 @@ class AgentService:
         self.bus = bus
         self.verbose = verbose
         self.num_iterations = num_iterations
+        # Agents already run in their own threads; this caps how many hit Ollama at once
+        self.ollama_slots = threading.BoundedSemaphore(num_parallel)
         self.agents = []
         self.agent_names = []
 
@@ -33,7 +36,8 @@ class AgentService:
                 colors=self.colors,
                 bus=self.bus,
                 verbose=self.verbose,
-                max_iterations=self.num_iterations
+                max_iterations=self.num_iterations,
+                ollama_slots=self.ollama_slots
             )
             t = threading.Thread(target=agent.run)
             self.agents.append(t)
@@ -7,7 +7,7 @@ class ManagerAnalytics:
         self.get_db = get_db
         self.colors = colors
 
-    def save_run_summary(self, run_id, agent_names, progress, start_time, token_count):
+    def save_run_summary(self, run_id, agent_names, progress, start_time, token_count, collect_feedback=True):
         elapsed = time.time() - start_time
         manager_summary = []
         for name in agent_names:
@@ -20,6 +20,8 @@ class ManagerAnalytics:
             )
             conn.commit()
         log_manager(f"\n{self.colors.BOLD}{self.colors.OKGREEN}All tasks are complete!{self.colors.ENDC}", colors=self.colors, level="SUCCESS")
+        if not collect_feedback:
+            return
         log_manager(f"\n{self.colors.BOLD}{self.colors.OKBLUE}Manager: Do you have any questions, suggestions, or would you like to start a new task?{self.colors.ENDC}", colors=self.colors, level="INFO")
         user_input = input(f"{self.colors.BOLD}Enter your feedback or type a new task: {self.colors.ENDC}")
         if user_input.strip():
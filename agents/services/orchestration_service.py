@@ -1,6 +1,7 @@
 # agents/orchestration_service.py
 from agents.utils.logging_utils import log_manager
-import time, json
+import time
+import orjson
 
 class OrchestrationService:
     def __init__(self, bus, agent_names, db_run_id, db_agent_ids, colors, agent_emojis):
@@ -18,7 +19,7 @@ class OrchestrationService:
         agent_task_summaries = {name: [] for name in self.agent_names}
         agent_current_task = {name: 0 for name in self.agent_names}
         # Cache parsed agent tasks for each agent
-        agent_tasks_cache = {name: json.loads(get_agent_tasks(name)) for name in self.agent_names}
+        agent_tasks_cache = {name: orjson.loads(get_agent_tasks(name)) for name in self.agent_names}
         while True:
             updated = False
             for name in self.agent_names:
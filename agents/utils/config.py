@@ -1,4 +1,6 @@
 # agents/utils/config.py
+import os
+
 class Colors:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -14,3 +16,18 @@ AGENT_COLORS = [Colors.OKBLUE, Colors.OKCYAN, Colors.OKGREEN, Colors.WARNING, Co
 AGENT_EMOJIS = ["🤖", "🦾", "🧠", "🚀", "🦉", "🐍", "🦾", "🦾", "🦾"]
 
 MODEL_NAME = 'gpt-oss:120b-cloud'
+
+# Seconds a cached manager subtask plan stays valid (see agent_list_cache table)
+AGENT_LIST_CACHE_TTL = 86400
+
+# Max concurrent agent chat requests; match the Ollama server's OLLAMA_NUM_PARALLEL.
+# The server treats 0 as "auto", so unset, non-positive, or unparsable values fall back to 4.
+try:
+    OLLAMA_NUM_PARALLEL = int(os.environ.get('OLLAMA_NUM_PARALLEL', 4))
+except ValueError:
+    OLLAMA_NUM_PARALLEL = 4
+if OLLAMA_NUM_PARALLEL < 1:
+    OLLAMA_NUM_PARALLEL = 4
+
+# Max tasks sent to the planner in one estimate_agents_batch request
+PLANNER_BATCH_SIZE = 8
@@ -18,4 +18,4 @@ if __name__ == "__main__":
         agent_emojis=AGENT_EMOJIS,
         verbose=args.verbose
     )
-    manager.orchestrate()
+    manager.orchestrate_interactive()
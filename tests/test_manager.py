@@ -0,0 +1,336 @@
+import asyncio, itertools, json, os, random, tempfile, threading, time, types, unittest
+from unittest import mock
+
+import agents.core.manager as manager_module
+import agents.db.db as db
+from agents.core.manager import Manager, BATCH_PLANNER_PROMPT, _extract_content
+from agents.utils.config import Colors
+
+
+def _reply(content):
+    return types.SimpleNamespace(message=types.SimpleNamespace(content=content))
+
+
+class StubOllama:
+    """
+    Sync stub client; `replies` maps the attempt seed to a reply (or exception).
+    Tests patch the seed source so attempts get seeds 0, 1, 2 in order. A seed listed in
+    `gates` blocks until that event is set, then is recorded in `completed`.
+    """
+
+    def __init__(self, replies, delays=None, gates=None):
+        self.replies = replies
+        self.delays = delays or {}
+        self.gates = gates or {}
+        self.calls = []
+        self.completed = []
+        self.lock = threading.Lock()
+
+    def chat(self, model, messages, options=None):
+        seed = (options or {}).get("seed")
+        with self.lock:
+            self.calls.append(messages)
+        time.sleep(self.delays.get(seed, 0))
+        if seed in self.gates:
+            self.gates[seed].wait(5)
+        with self.lock:
+            self.completed.append(seed)
+        reply = self.replies[seed]
+        if isinstance(reply, Exception):
+            raise reply
+        return _reply(reply)
+
+
+class AsyncStubOllama:
+    """Module-like stub exposing `AsyncClient`, so the manager takes the native async path."""
+
+    def __init__(self, replies, delays=None):
+        self.replies = replies
+        self.delays = delays or {}
+        self.completed = []
+        self.cancelled = []
+        stub = self
+
+        class AsyncClient:
+            async def chat(self, model, messages, options=None):
+                seed = (options or {}).get("seed")
+                try:
+                    await asyncio.sleep(stub.delays.get(seed, 0))
+                except asyncio.CancelledError:
+                    stub.cancelled.append(seed)
+                    raise
+                stub.completed.append(seed)
+                reply = stub.replies[seed]
+                if isinstance(reply, Exception):
+                    raise reply
+                return _reply(reply)
+
+        self.AsyncClient = AsyncClient
+
+    def chat(self, model, messages, options=None):
+        raise AssertionError("sync chat must not be used when AsyncClient is available")
+
+
+class ManagerTestCase(unittest.TestCase):
+    fixed_seeds = True
+
+    def setUp(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp.close()
+        self.addCleanup(os.remove, tmp.name)
+        patcher = mock.patch.object(db, "DB_PATH", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        log_patcher = mock.patch("agents.core.manager.log_manager")
+        log_patcher.start()
+        self.addCleanup(log_patcher.stop)
+        # Deterministic per-attempt seeds (0, 1, 2, ...) so stubs can tell attempts apart
+        if self.fixed_seeds:
+            seed_patcher = mock.patch("agents.core.manager.random.randrange", side_effect=itertools.count())
+            seed_patcher.start()
+            self.addCleanup(seed_patcher.stop)
+        db.init_db()
+
+    def make_manager(self, client, **kwargs):
+        return Manager("test-model", client, Colors, [], ["*"], **kwargs)
+
+
+class EstimateAgentsTest(ManagerTestCase):
+    def test_first_valid_attempt_wins(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        client = StubOllama(
+            {0: '["slow"]', 1: '["fast 1", "fast 2"]', 2: '["slower"]'},
+            gates={0: release, 2: release},
+        )
+        agent_list = self.make_manager(client).estimate_agents("task")
+        self.assertEqual(agent_list, ["fast 1", "fast 2"])
+        # The slow attempts are still blocked, so estimate_agents did not wait for them
+        self.assertNotIn(0, client.completed)
+        self.assertNotIn(2, client.completed)
+
+    def test_async_client_first_valid_attempt_wins_and_cancels_the_rest(self):
+        client = AsyncStubOllama(
+            {0: '["slow"]', 1: '["fast 1", "fast 2"]', 2: '["slower"]'},
+            delays={0: 5, 2: 5},
+        )
+        agent_list = self.make_manager(client).estimate_agents("task")
+        self.assertEqual(agent_list, ["fast 1", "fast 2"])
+        self.assertEqual(client.completed, [1])
+        self.assertEqual(sorted(client.cancelled), [0, 2])
+
+    def test_async_client_failed_attempt_does_not_abort_planning(self):
+        client = AsyncStubOllama({0: ConnectionError("boom"), 1: '["a", "b"]', 2: '["a", "b"]'}, delays={1: 0.01, 2: 0.01})
+        self.assertEqual(self.make_manager(client).estimate_agents("task"), ["a", "b"])
+
+    def test_failed_attempt_does_not_abort_planning(self):
+        client = StubOllama({0: ConnectionError("boom"), 1: '["a", "b"]', 2: '["a", "b"]'})
+        self.assertEqual(self.make_manager(client).estimate_agents("task"), ["a", "b"])
+
+    def test_all_attempts_failing_raises(self):
+        client = StubOllama({seed: ConnectionError("boom") for seed in range(3)})
+        with self.assertRaises(ConnectionError):
+            self.make_manager(client).estimate_agents("task")
+
+    def test_fallback_runs_only_after_every_attempt_fails(self):
+        text = "First do this thing. Then do that other thing."
+        client = StubOllama({0: text, 1: "[not json", 2: text}, delays={2: 0.2})
+        agent_list = self.make_manager(client).estimate_agents("task")
+        self.assertEqual(agent_list, ["First do this thing.", "Then do that other thing."])
+        self.assertEqual(len(client.calls), 3)
+
+    def test_empty_list_is_not_accepted(self):
+        client = StubOllama({0: "[]", 1: "[]", 2: '["real"]'}, delays={2: 0.1})
+        self.assertEqual(self.make_manager(client).estimate_agents("task"), ["real"])
+
+
+class PlanningSeedTest(ManagerTestCase):
+    fixed_seeds = False
+
+    def test_each_attempt_gets_a_fresh_random_seed(self):
+        seeds = []
+        randrange = random.randrange
+
+        def spy(n):
+            seeds.append(randrange(n))
+            return seeds[-1]
+
+        client = StubOllama({})
+        client.chat = lambda model, messages, options=None: _reply('["a"]')
+        manager = self.make_manager(client, cache_ttl=0)
+        with mock.patch("agents.core.manager.random.randrange", side_effect=spy):
+            manager.estimate_agents("task")
+            manager.estimate_agents("task")
+        self.assertEqual(len(seeds), 6)
+        self.assertEqual(len(set(seeds)), 6)
+
+
+class OrchestrateTest(ManagerTestCase):
+    def setUp(self):
+        super().setUp()
+        out = tempfile.TemporaryDirectory()
+        self.addCleanup(out.cleanup)
+        # Point the output root at a temp dir and stub out agent threads and the review loop
+        patchers = [mock.patch.object(manager_module, "__file__", os.path.join(out.name, "core", "manager.py"))]
+        for name in ("AgentService", "OrchestrationService", "ManagerAnalytics"):
+            patchers.append(mock.patch.object(manager_module, name))
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        _, self.AgentService, self.OrchestrationService, _ = [patcher.start() for patcher in patchers]
+        self.AgentService.return_value.create_agents.side_effect = (
+            lambda agent_subtasks: ([f"agent_{i+1}" for i in range(len(agent_subtasks))], [])
+        )
+        self.OrchestrationService.return_value.run_orchestration.return_value = ({}, {})
+
+    def test_num_agents_is_clamped_to_subtask_count(self):
+        report_path = self.make_manager(StubOllama({})).orchestrate("task", num_agents=3, agent_list=["only subtask"])
+        self.AgentService.return_value.create_agents.assert_called_once_with([["only subtask"]])
+        self.assertTrue(os.path.exists(report_path))
+
+    def test_empty_agent_list_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.make_manager(StubOllama({})).orchestrate("task", num_agents=2, agent_list=[])
+        self.AgentService.return_value.create_agents.assert_not_called()
+
+
+class AgentListCacheTest(ManagerTestCase):
+    def test_cache_hit_skips_ollama(self):
+        client = StubOllama({seed: '["a", "b"]' for seed in range(3)})
+        manager = self.make_manager(client)
+        manager.estimate_agents("task")
+        client.calls.clear()
+        self.assertEqual(manager.estimate_agents("task"), ["a", "b"])
+        self.assertEqual(client.calls, [])
+
+    def test_expired_entry_is_a_miss(self):
+        client = StubOllama({seed: '["a", "b"]' for seed in range(6)})
+        manager = self.make_manager(client, cache_ttl=60)
+        manager.estimate_agents("task")
+        with db.get_db() as conn:
+            conn.execute("UPDATE agent_list_cache SET created_at=datetime('now', '-120 seconds')")
+            conn.commit()
+        client.calls.clear()
+        manager.estimate_agents("task")
+        self.assertTrue(client.calls)
+
+    def test_cache_is_keyed_by_model(self):
+        client = StubOllama({seed: '["a", "b"]' for seed in range(6)})
+        self.make_manager(client).estimate_agents("task")
+        client.calls.clear()
+        Manager("other-model", client, Colors, [], ["*"]).estimate_agents("task")
+        self.assertTrue(client.calls)
+
+    def test_empty_plan_is_not_cached(self):
+        manager = self.make_manager(StubOllama({}))
+        manager._cache_agent_list("task", [])
+        self.assertIsNone(manager._get_cached_agent_list("task"))
+
+    def test_missing_table_is_a_miss(self):
+        with db.get_db() as conn:
+            conn.execute("DROP TABLE agent_list_cache")
+            conn.commit()
+        client = StubOllama({seed: '["a", "b"]' for seed in range(3)})
+        self.assertEqual(self.make_manager(client).estimate_agents("task"), ["a", "b"])
+
+
+class SharedConnectionTest(ManagerTestCase):
+    def test_db_commits_on_exit(self):
+        manager = self.make_manager(StubOllama({}))
+        manager._conn = db.connect()
+        self.addCleanup(manager._conn.close)
+        with manager._db() as conn:
+            conn.execute("INSERT INTO agent_iterations (agent_id, iteration) VALUES (1, 0)")
+        self.assertFalse(manager._conn.in_transaction)
+        with db.get_db() as other:
+            other.execute("INSERT INTO agent_iterations (agent_id, iteration) VALUES (2, 0)")
+            other.commit()
+            self.assertEqual(other.execute("SELECT COUNT(*) FROM agent_iterations").fetchone()[0], 2)
+
+
+class BatchStubOllama:
+    """Answers batch planning requests with `batch_reply(tasks)` and single-task requests with `["<task> solo"]`."""
+
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.batch_calls = []
+        self.single_calls = []
+        self.lock = threading.Lock()
+
+    def chat(self, model, messages, options=None):
+        if messages[0]["content"] == BATCH_PLANNER_PROMPT:
+            tasks = json.loads(messages[1]["content"])
+            with self.lock:
+                self.batch_calls.append(tasks)
+            return _reply(self.batch_reply(tasks))  # batch_reply may raise to simulate a failed request
+        with self.lock:
+            self.single_calls.append(messages[1]["content"])
+        return _reply(json.dumps([f"{messages[1]['content']} solo"]))
+
+
+class EstimateAgentsBatchTest(ManagerTestCase):
+    def test_tasks_are_packed_into_batches(self):
+        client = BatchStubOllama(lambda tasks: json.dumps([[f"{t} step"] for t in tasks]))
+        tasks = [f"t{i}" for i in range(10)]
+        results = self.make_manager(client).estimate_agents_batch(tasks)
+        self.assertEqual(results, [[f"{t} step"] for t in tasks])
+        self.assertEqual(sorted(len(chunk) for chunk in client.batch_calls), [2, 8])
+        self.assertEqual(client.single_calls, [])
+
+    def test_length_mismatch_falls_back_per_task(self):
+        client = BatchStubOllama(lambda tasks: json.dumps([["only one"]]))
+        results = self.make_manager(client).estimate_agents_batch(["a", "b"])
+        self.assertEqual(results, [["a solo"], ["b solo"]])
+        self.assertEqual(sorted(set(client.single_calls)), ["a", "b"])
+
+    def test_empty_inner_list_falls_back_for_that_task(self):
+        client = BatchStubOllama(lambda tasks: json.dumps([[], ["b step"]]))
+        manager = self.make_manager(client)
+        self.assertEqual(manager.estimate_agents_batch(["a", "b"]), [["a solo"], ["b step"]])
+        self.assertEqual(set(client.single_calls), {"a"})
+        self.assertEqual(manager._get_cached_agent_list("a"), ["a solo"])
+
+    def test_failed_chunk_falls_back_per_task_and_keeps_other_chunks(self):
+        def batch_reply(tasks):
+            if "t0" in tasks:
+                raise ConnectionError("boom")
+            return json.dumps([[f"{t} step"] for t in tasks])
+
+        client = BatchStubOllama(batch_reply)
+        manager = self.make_manager(client)
+        tasks = [f"t{i}" for i in range(10)]
+        results = manager.estimate_agents_batch(tasks)
+        self.assertEqual(results, [[f"{t} solo"] for t in tasks[:8]] + [["t8 step"], ["t9 step"]])
+        self.assertEqual(set(client.single_calls), set(tasks[:8]))
+        self.assertEqual(manager._get_cached_agent_list("t9"), ["t9 step"])
+
+    def test_cached_tasks_skip_the_batch_call(self):
+        client = BatchStubOllama(lambda tasks: json.dumps([[f"{t} step"] for t in tasks]))
+        manager = self.make_manager(client)
+        manager.estimate_agents_batch(["a", "b"])
+        client.batch_calls.clear()
+        self.assertEqual(manager.estimate_agents_batch(["a", "b"]), [["a step"], ["b step"]])
+        self.assertEqual(client.batch_calls, [])
+
+
+class ExtractContentTest(unittest.TestCase):
+    def test_object_response(self):
+        self.assertEqual(_extract_content(_reply("hi")), "hi")
+
+    def test_object_with_str_message(self):
+        self.assertEqual(_extract_content(types.SimpleNamespace(message="hi")), "hi")
+
+    def test_dict_response(self):
+        self.assertEqual(_extract_content({"message": {"role": "assistant", "content": "hi"}}), "hi")
+
+    def test_dict_with_str_message(self):
+        self.assertEqual(_extract_content({"message": "hi"}), "hi")
+
+    def test_str_response(self):
+        self.assertEqual(_extract_content("hi"), "hi")
+
+    def test_unknown_shape_falls_back_to_str(self):
+        self.assertEqual(_extract_content({"other": 1}), "{'other': 1}")
+
+
+if __name__ == "__main__":
+    unittest.main()